@@ -1,42 +1,63 @@
+import asyncio
 import json
 import os
+import re
 import sys
 import time
 import math
 import subprocess
-import socket
 import shutil
+import traceback
+import functools
+import importlib.util
 from dataclasses import dataclass, asdict, field
 from pathlib import Path
-from collections import deque
 
+import numpy as np
 import psutil
-import pyqtgraph as pg
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from icmplib import async_ping as icmp_async_ping, SocketPermissionError
+except ImportError:
+    icmp_async_ping = None
+    SocketPermissionError = None
 
 from PySide6.QtCore import (
-    Qt, QTimer, QSize, QRunnable, QThreadPool, Signal, QObject, QPoint
+    Qt, QTimer, QSize, QThread, QRunnable, QThreadPool, Signal, QObject, QPoint, QSaveFile, QIODevice, QRectF, QEvent
 )
-from PySide6.QtGui import QAction, QPixmap, QImageReader, QColor, QCursor
+from PySide6.QtGui import QAction, QPixmap, QPixmapCache, QImage, QImageReader, QPainter, QColor, QCursor
+from PySide6.QtNetwork import QNetworkInformation
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QToolButton,
     QDialog, QTabWidget, QFormLayout, QSpinBox, QDoubleSpinBox, QLineEdit,
     QPushButton, QFileDialog, QListWidget, QListWidgetItem, QCheckBox,
     QSystemTrayIcon, QMenu, QStyle, QTableWidget, QTableWidgetItem, QHeaderView,
-    QGraphicsBlurEffect, QComboBox, QStackedWidget, QSizePolicy,
+    QGraphicsBlurEffect, QGraphicsScene, QGraphicsPixmapItem, QComboBox, QStackedWidget, QSizePolicy,
     QGroupBox, QColorDialog, QSlider, QTextEdit, QAbstractItemView
 )
 
 APP_NAME = "NetPulse"
 APP_VERSION = "0.1"
 
+TRAY_REFRESH_MS = 2500
+
+_IS_WIN = sys.platform.startswith("win")
+_IS_MAC = sys.platform == "darwin"
 
 
 
+
+@functools.cache
 def app_config_dir() -> Path:
     home = Path.home()
-    if sys.platform.startswith("win"):
+    if _IS_WIN:
         base = Path(os.environ.get("APPDATA", home))
-    elif sys.platform == "darwin":
+    elif _IS_MAC:
         base = home / "Library" / "Application Support"
     else:
         base = home / ".config"
@@ -45,16 +66,19 @@ def app_config_dir() -> Path:
     return p
 
 
+@functools.cache
 def app_assets_dir() -> Path:
     d = app_config_dir() / "assets"
     d.mkdir(parents=True, exist_ok=True)
     return d
 
 
+@functools.cache
 def packaged_assets_dir() -> Path:
     return Path(__file__).resolve().parent / "assets"
 
 
+@functools.cache
 def backgrounds_dir() -> Path:
     d = app_assets_dir() / "backgrounds"
     d.mkdir(parents=True, exist_ok=True)
@@ -64,16 +88,32 @@ def backgrounds_dir() -> Path:
 SETTINGS_PATH = app_config_dir() / "settings.json"
 
 
+_IMG_EXT = frozenset({".png", ".jpg", ".jpeg", ".webp"})
+
+
+def list_image_files(d: Path) -> list[Path]:
+    # scandir отдаёт тип файла из самой записи каталога — без отдельного stat на каждый файл
+    out = []
+    with os.scandir(d) as it:
+        for e in it:
+            if not e.is_file(follow_symlinks=False):
+                continue
+            if os.path.splitext(e.name)[1].lower() not in _IMG_EXT:
+                continue
+            out.append(Path(e.path))
+    out.sort()
+    return out
+
+
 def ensure_seed_backgrounds():
     src = packaged_assets_dir() / "backgrounds"
     dst = backgrounds_dir()
     try:
-        if src.exists() and src.is_dir():
-            for p in src.iterdir():
-                if p.is_file() and p.suffix.lower() in (".png", ".jpg", ".jpeg", ".webp"):
-                    out = dst / p.name
-                    if not out.exists():
-                        shutil.copy2(p, out)
+        if src.is_dir():
+            for p in list_image_files(src):
+                out = dst / p.name
+                if not out.exists():
+                    shutil.copy2(p, out)
     except Exception:
         pass
 
@@ -130,57 +170,95 @@ class Settings:
     blur_radius: int = 18
 
 
-def save_settings(s: Settings) -> None:
-    SETTINGS_PATH.write_text(json.dumps(asdict(s), ensure_ascii=False, indent=2), encoding="utf-8")
+# поле -> (допустимые значения, значение по умолчанию)
+_ENUMS = {
+    "mode": (("simple", "advanced"), "simple"),
+    "graph_color_mode": (("auto", "custom"), "auto"),
+}
+# поле -> значение, если пусто
+_NON_EMPTY = {
+    "ping_host": "1.1.1.1",
+    "graph_custom_color": "#4db7ff",
+}
+# (поле, min, max)
+_CLAMP_INT = (
+    ("ping_port", 0, 65535),
+    ("stats_refresh_ms", 500, 10000),
+    ("ping_refresh_ms", 700, 20000),
+    ("blur_radius", 0, 60),
+    ("window_opacity", 0, 60),
+    ("line_width", 1, 6),
+)
 
 
-def load_settings() -> Settings:
-    ensure_seed_backgrounds()
+def validate_settings(s: Settings) -> None:
+    for name, (allowed, default) in _ENUMS.items():
+        if getattr(s, name) not in allowed:
+            setattr(s, name, default)
+    for name, default in _NON_EMPTY.items():
+        if not getattr(s, name):
+            setattr(s, name, default)
 
-    if SETTINGS_PATH.exists():
-        try:
-            data = json.loads(SETTINGS_PATH.read_text(encoding="utf-8"))
-            base = asdict(Settings())
-            base.update(data)
-            s = Settings(**base)
+    if not isinstance(s.ping_port, int):
+        s.ping_port = 0
+    for name in ("simple_adapter", "graph_adapter"):
+        if not isinstance(getattr(s, name), str):
+            setattr(s, name, "active")
+    if not isinstance(s.monitored_adapters, list):
+        s.monitored_adapters = []
+    s.monitored_adapters = [n for n in s.monitored_adapters if isinstance(n, str) and n]
 
-            if s.mode not in ("simple", "advanced"):
-                s.mode = "simple"
-            if not s.ping_host:
-                s.ping_host = "1.1.1.1"
-            if not isinstance(s.ping_port, int):
-                s.ping_port = 0
-            s.ping_port = int(max(0, min(65535, s.ping_port)))
+    for name, lo, hi in _CLAMP_INT:
+        setattr(s, name, int(max(lo, min(hi, getattr(s, name)))))
 
-            if s.graph_color_mode not in ("auto", "custom"):
-                s.graph_color_mode = "auto"
-            if not s.graph_custom_color:
-                s.graph_custom_color = "#4db7ff"
-            if not isinstance(s.monitored_adapters, list):
-                s.monitored_adapters = []
+    if s.good_mbps < s.ok_mbps:
+        s.good_mbps, s.ok_mbps = s.ok_mbps, s.good_mbps
+    if s.good_ping_ms > s.ok_ping_ms:
+        s.good_ping_ms, s.ok_ping_ms = s.ok_ping_ms, s.good_ping_ms
 
 
-            s.stats_refresh_ms = int(max(500, min(10000, s.stats_refresh_ms)))
-            s.ping_refresh_ms = int(max(700, min(20000, s.ping_refresh_ms)))
+_LAST_SETTINGS_BLOB = None
 
-            s.blur_radius = int(max(0, min(60, s.blur_radius)))
-            s.window_opacity = int(max(0, min(60, s.window_opacity)))
-            s.line_width = int(max(1, min(6, s.line_width)))
 
+def save_settings(s: Settings) -> None:
+    global _LAST_SETTINGS_BLOB
+    data = asdict(s)
+    if orjson is not None:
+        blob = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        blob = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    # содержимое не изменилось (например, окно вернули на то же место) — не пишем файл
+    if blob == _LAST_SETTINGS_BLOB:
+        return
+    # QSaveFile пишет во временный файл и подменяет settings.json через rename — при падении
+    # посреди записи остаётся старый целый файл, а не обрезанный JSON
+    f = QSaveFile(str(SETTINGS_PATH))
+    if not f.open(QIODevice.WriteOnly):
+        return
+    f.write(blob)
+    if f.commit():
+        _LAST_SETTINGS_BLOB = blob
 
-            if s.good_mbps < s.ok_mbps:
-                s.good_mbps, s.ok_mbps = s.ok_mbps, s.good_mbps
 
+def load_settings() -> Settings:
+    global _LAST_SETTINGS_BLOB
+    ensure_seed_backgrounds()
 
-            if s.good_ping_ms > s.ok_ping_ms:
-                s.good_ping_ms, s.ok_ping_ms = s.ok_ping_ms, s.good_ping_ms
+    if SETTINGS_PATH.exists():
+        try:
+            raw = SETTINGS_PATH.read_bytes()
+            _LAST_SETTINGS_BLOB = raw
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            base = asdict(Settings())
+            base.update(data)
+            s = Settings(**base)
 
+            validate_settings(s)
 
             if s.use_builtin_background:
                 bg = backgrounds_dir() / (s.builtin_background_name or "")
                 if not bg.exists():
-                    files = sorted([p for p in backgrounds_dir().iterdir()
-                                    if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".webp")])
+                    files = list_image_files(backgrounds_dir())
                     if files:
                         s.builtin_background_name = files[0].name
 
@@ -190,8 +268,7 @@ def load_settings() -> Settings:
 
     s = Settings()
 
-    files = sorted([p for p in backgrounds_dir().iterdir()
-                    if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".webp")])
+    files = list_image_files(backgrounds_dir())
     if files and not (backgrounds_dir() / s.builtin_background_name).exists():
         s.builtin_background_name = files[0].name
 
@@ -205,7 +282,7 @@ def _startup_folder_win() -> Path:
 
 
 def set_windows_autostart(app_name: str, enable: bool) -> None:
-    if not sys.platform.startswith("win"):
+    if not _IS_WIN:
         return
 
     try:
@@ -251,36 +328,70 @@ start "" {target_cmd}
 
 
 
+_ADAPTERS_CACHE = {"t": 0.0, "stats": None, "names": ()}
+
+# loopback (по префиксу) и виртуальные/VPN адаптеры — не кандидаты в "активный"
+_VIRT_RE = re.compile(r"^lo|virtual|vmware|hyper-v|vbox|loopback|tunnel|tap|tun|vpn|wintun|wireguard")
+_ACTIVE_IO_PREV = {"io": None}
+
+
+def _get_if_info(ttl: float = 5.0):
+    # net_if_stats на Windows дорогой (GetAdaptersAddresses/GetIfEntry2), кешируем на ttl сек
+    # вызывается и из NetSampleTask: GUI-поток может сбросить кеш (invalidate_adapter_cache)
+    # в любой момент, поэтому глобал читаем один раз и возвращаем локальную ссылку
+    now = time.monotonic()
+    stats = _ADAPTERS_CACHE["stats"]
+    if stats is None or now - _ADAPTERS_CACHE["t"] > ttl:
+        stats = psutil.net_if_stats()
+        _ADAPTERS_CACHE["stats"] = stats
+        _ADAPTERS_CACHE["names"] = tuple(sorted(stats.keys()))
+        _ADAPTERS_CACHE["t"] = now
+    return stats
+
+
+def invalidate_adapter_cache() -> None:
+    _ADAPTERS_CACHE["stats"] = None
+
+
+def reset_active_io_window() -> None:
+    # следующий pick_active_adapter_name сделает свежий замер 200 мс, а не дельту от старого снимка
+    _ACTIVE_IO_PREV["io"] = None
+
+
 def list_adapters() -> list[str]:
-    return sorted(psutil.net_if_stats().keys())
+    _get_if_info()
+    return list(_ADAPTERS_CACHE["names"])
 
 
 def pick_active_adapter_name() -> str:
-    stats = psutil.net_if_stats()
-    addrs = psutil.net_if_addrs()
+    stats = _get_if_info()
+
+    # активный адаптер = тот, через который идёт трафик; net_if_addrs не трогаем (DNS/anycast/multicast
+    # на Windows). Дельта считается от прошлого вызова, при самом первом — короткий замер 200 мс
+    prev = _ACTIVE_IO_PREV["io"]
+    if prev is None:
+        prev = psutil.net_io_counters(pernic=True)
+        time.sleep(0.2)
+    io = psutil.net_io_counters(pernic=True)
+    _ACTIVE_IO_PREV["io"] = io
 
     candidates = []
     for name, st in stats.items():
         if not st.isup:
             continue
-        if name.lower().startswith(("lo", "loopback")):
-            continue
-        low = name.lower()
-        if any(x in low for x in ["virtual", "vmware", "hyper-v", "vbox", "loopback", "tunnel", "tap", "tun", "vpn", "wintun", "wireguard"]):
+        if _VIRT_RE.search(name.lower()):
             continue
 
-        ip_score = 0
-        for a in addrs.get(name, []):
-            fam = getattr(a, "family", None)
-            if fam and str(fam).endswith("AF_INET") and a.address and a.address != "127.0.0.1":
-                ip_score += 10
+        delta = 0
+        c, pc = io.get(name), prev.get(name)
+        if c is not None and pc is not None:
+            delta = max(0, (c.bytes_sent + c.bytes_recv) - (pc.bytes_sent + pc.bytes_recv))
 
-        speed_score = st.speed if st.speed else 0
-        candidates.append((ip_score + speed_score / 10, name))
+        candidates.append((delta, st.speed or 0, name))
 
     if candidates:
         candidates.sort(reverse=True)
-        return candidates[0][1]
+        return candidates[0][2]
 
     for name, st in stats.items():
         if st.isup:
@@ -288,102 +399,180 @@ def pick_active_adapter_name() -> str:
     return "Нет сети"
 
 
-def ping_once(host: str = "1.1.1.1", timeout_ms: int = 800):
+# icmplib нужен ICMP-сокет: на Windows он всегда raw (privileged=False игнорируется) и требует
+# прав администратора. Один отказ в правах — дальше сразу системный ping, без повторных попыток
+_ICMP_STATE = {"usable": icmp_async_ping is not None}
+
+
+async def ping_once(host: str = "1.1.1.1", timeout_ms: int = 800):
+    if _ICMP_STATE["usable"]:
+        try:
+            h = await icmp_async_ping(host, count=1, timeout=timeout_ms / 1000, privileged=False)
+            if not h.is_alive:
+                return None
+            return int(round(h.avg_rtt))
+        except SocketPermissionError:
+            _ICMP_STATE["usable"] = False
+        except Exception:
+            # ошибка резолва и т.п. — пробуем системный ping
+            pass
+    return await asyncio.to_thread(_ping_subprocess, host, timeout_ms)
+
+
+# "time=12.3 ms", "time<1ms", "время=14мс" — ищем по сырым байтам вывода ping:
+# на Windows он в OEM-кодировке (cp866), поэтому "мс" перечислено в cp866/cp1251/utf-8
+_PING_RE = re.compile(rb"[=<]\s*(\d+(?:[.,]\d+)?)\s*(?:ms|\xac\xe1|\xec\xf1|\xd0\xbc\xd1\x81)", re.IGNORECASE)
+
+
+_PING_ARGV_WIN = ["ping", "-n", "1", "-w"]  # + timeout_ms, host
+_PING_ARGV_UNIX = ["ping", "-c", "1"]       # + host
+_PING_CREATIONFLAGS = subprocess.CREATE_NO_WINDOW if _IS_WIN else 0
+
+
+def _ping_subprocess(host: str, timeout_ms: int):
     try:
-        if sys.platform.startswith("win"):
-            cmd = ["ping", "-n", "1", "-w", str(timeout_ms), host]
+        if _IS_WIN:
+            cmd = [*_PING_ARGV_WIN, str(timeout_ms), host]
         else:
-            cmd = ["ping", "-c", "1", host]
+            cmd = [*_PING_ARGV_UNIX, host]
 
-        creation = subprocess.CREATE_NO_WINDOW if sys.platform.startswith("win") else 0
-        p = subprocess.run(cmd, capture_output=True, text=True, creationflags=creation)
-        out = (p.stdout or "") + (p.stderr or "")
+        p = subprocess.run(cmd, capture_output=True, creationflags=_PING_CREATIONFLAGS)
         if p.returncode != 0:
             return None
 
-        s = out.lower().replace(" ", "")
-        idx = s.find("time=")
-        if idx != -1:
-            t = s[idx + 5:]
-            end = t.find("ms")
-            if end != -1:
-                val = t[:end].replace("<", "")
-                try:
-                    return int(round(float(val)))
-                except Exception:
-                    return None
-
-        idx = s.find("время=")
-        if idx != -1:
-            t = s[idx + 6:]
-            end = t.find("мс")
-            if end != -1:
-                val = t[:end].replace("<", "")
-                try:
-                    return int(round(float(val)))
-                except Exception:
-                    return None
-
-        return None
+        m = _PING_RE.search(p.stdout + p.stderr)
+        if m is None:
+            return None
+        return int(round(float(m.group(1).replace(b",", b"."))))
     except Exception:
         return None
 
 
-def tcp_ping(host: str, port: int = 443, timeout: float = 1.2):
+async def tcp_ping(host: str, port: int = 443, timeout: float = 1.2):
     try:
         start = time.perf_counter()
-        with socket.create_connection((host, port), timeout=timeout):
-            pass
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
         end = time.perf_counter()
+        writer.close()
         return int(round((end - start) * 1000))
     except Exception:
         return None
 
 
-def ping_smart(host: str, port: int = 0):
+async def ping_smart(host: str, port: int = 0):
     if port and port > 0:
-        return tcp_ping(host, int(port))
-    ms = ping_once(host)
+        return await tcp_ping(host, int(port))
+    ms = await ping_once(host)
     if ms is not None:
         return ms
-    return tcp_ping(host, 443)
+    return await tcp_ping(host, 443)
 
 
 
-class PingSignals(QObject):
+class AsyncPinger(QThread):
     done = Signal(object)  # int|None
 
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Selector-цикл: Proactor (дефолт на Windows) не умеет ICMP-сокеты icmplib
+        self._loop = asyncio.SelectorEventLoop()
+
+    def run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        self._loop.close()
+
+    def request(self, host: str, port: int):
+        asyncio.run_coroutine_threadsafe(self._ping(host, int(port or 0)), self._loop)
+
+    async def _ping(self, host: str, port: int):
+        ms = await ping_smart(host, port)
+        self.done.emit(ms)
+
+    def stop(self):
+        if self.isRunning():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self.wait(2000)
 
-class PingTask(QRunnable):
-    def __init__(self, host: str, port: int):
+
+
+class NetSampleSignals(QObject):
+    done = Signal(object, object, float, float)  # pernic|None при ошибке, active adapter|None, time.time(), time.monotonic()
+
+
+class NetSampleTask(QRunnable):
+    def __init__(self, check_active: bool):
         super().__init__()
-        self.host = host
-        self.port = int(port or 0)
-        self.signals = PingSignals()
+        self.check_active = check_active
+        self.signals = NetSampleSignals()
 
     def run(self):
-        ms = ping_smart(self.host, self.port)
-        self.signals.done.emit(ms)
+        # сигнал уходит всегда: по нему сбрасывается _sample_inflight, иначе тики встанут навсегда
+        active = pernic = None
+        try:
+            if self.check_active:
+                active = pick_active_adapter_name()
+            pernic = psutil.net_io_counters(pernic=True)
+        except Exception:
+            traceback.print_exc()
+        self.signals.done.emit(pernic, active, time.time(), time.monotonic())
 
 
 
-def is_image_readable(path: Path) -> bool:
+@functools.lru_cache(maxsize=256)
+def _is_readable_cached(path_str: str, mtime_ns: int, size: int) -> bool:
     try:
-        r = QImageReader(str(path))
+        r = QImageReader(path_str)
         return r.canRead()
     except Exception:
         return False
 
 
+def is_image_readable(path: Path) -> bool:
+    try:
+        st = path.stat()
+    except OSError:
+        return False
+    return _is_readable_cached(str(path), st.st_mtime_ns, st.st_size)
+
+
 def safe_pixmap(path: Path):
+    try:
+        key = f"{path}:{path.stat().st_mtime_ns}"
+    except OSError:
+        return None
+    pm = QPixmapCache.find(key)
+    if pm is not None and not pm.isNull():
+        return pm
     if not is_image_readable(path):
         return None
     pm = QPixmap(str(path))
     if pm.isNull():
         return None
+    QPixmapCache.insert(key, pm)
     return pm
 
 
+def blurred_pixmap(pm: QPixmap, size: QSize, radius: int) -> QPixmap:
+    # один раз прогоняем картинку через QGraphicsBlurEffect и отдаём готовый pixmap,
+    # чтобы эффект не пересчитывался на каждой перерисовке фона
+    src = pm.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    item = QGraphicsPixmapItem(src)
+    eff = QGraphicsBlurEffect()
+    eff.setBlurRadius(radius)
+    item.setGraphicsEffect(eff)
+    scene = QGraphicsScene()
+    scene.addItem(item)
+
+    rect = QRectF(0, 0, src.width(), src.height())
+    img = QImage(src.size(), QImage.Format_ARGB32_Premultiplied)
+    img.fill(Qt.transparent)
+    painter = QPainter(img)
+    scene.render(painter, rect, rect)
+    painter.end()
+    return QPixmap.fromImage(img)
+
+
 
 GREEN = "#4dff88"
 YELLOW = "#ffd24d"
@@ -415,32 +604,100 @@ def quality_color(value, good: float, ok: float, invert: bool = False) -> str:
         return RED
 
 
+def classify_quality(vals, good, ok, invert=False):
+    # 0 = GREEN, 1 = YELLOW, 2 = RED — та же логика, что в quality_color, но сразу для массива
+    vals = np.asarray(vals, dtype=np.float64)
+    valid = np.isfinite(vals)
+    if invert:
+        g = valid & (vals <= good)
+        y = valid & (vals <= ok)
+    else:
+        g = valid & (vals >= good)
+        y = valid & (vals >= ok)
+    return np.where(g, 0, np.where(y, 1, 2)).astype(np.int8)
+
+
+def _split_masks(y, good, ok, invert):
+    # маски зелёной/жёлтой/красной линий за один проход
+    n = y.size
+    g = np.zeros(n, np.bool_)
+    yl = np.zeros(n, np.bool_)
+    r = np.zeros(n, np.bool_)
+    for i in range(n):
+        v = y[i]
+        if not np.isfinite(v):
+            r[i] = True
+        elif (v <= good) if invert else (v >= good):
+            g[i] = True
+        elif (v <= ok) if invert else (v >= ok):
+            yl[i] = True
+        else:
+            r[i] = True
+    return g, yl, r
+
+
+# _split_masks, скомпилированный numba; None — numba нет (или ещё не загружали)
+_SPLIT_JIT = {"fn": None, "loaded": False}
+
+
+def ensure_split_kernel() -> None:
+    # numba тяжёлый на импорт и прогрев (~0.3 с), а нужен только графикам advanced —
+    # грузим вместе с pyqtgraph в _build_adv_page, а не на старте
+    if _SPLIT_JIT["loaded"]:
+        return
+    _SPLIT_JIT["loaded"] = True
+    try:
+        from numba import njit
+    except ImportError:
+        return
+    try:
+        fn = njit(cache=True)(_split_masks)
+        # история float32, прочие вызовы float64
+        fn(np.zeros(1, np.float32), 0.0, 0.0, False)
+        fn(np.zeros(1), 0.0, 0.0, False)
+    except Exception:
+        # frozen-сборка (cache=True без исходника: "no locator available") или ошибка компиляции —
+        # остаёмся на NumPy-пути classify_quality
+        return
+    _SPLIT_JIT["fn"] = fn
+
+
 def split_series_by_quality(xs, ys, good, ok, invert=False):
-    nan = float("nan")
-    x_g, y_g = [], []
-    x_y, y_y = [], []
-    x_r, y_r = [], []
+    xs_arr = np.asarray(xs, dtype=np.float64)
+    ys_arr = np.asarray(ys)
+    if ys_arr.dtype.kind != "f":
+        ys_arr = ys_arr.astype(np.float64)
+    kernel = _SPLIT_JIT["fn"]
+    if kernel is not None:
+        masks = kernel(ys_arr, float(good), float(ok), bool(invert))
+    else:
+        codes = classify_quality(ys_arr, good, ok, invert)
+        masks = (codes == 0, codes == 1, codes == 2)
 
-    for x, y in zip(xs, ys):
-        col = quality_color(y, good, ok, invert=invert)
-        try:
-            yf = float(y)
-        except Exception:
-            yf = nan
-
-        if col == GREEN:
-            x_g.append(x); y_g.append(yf)
-            x_y.append(x); y_y.append(nan)
-            x_r.append(x); y_r.append(nan)
-        elif col == YELLOW:
-            x_g.append(x); y_g.append(nan)
-            x_y.append(x); y_y.append(yf)
-            x_r.append(x); y_r.append(nan)
-        else:
-            x_g.append(x); y_g.append(nan)
-            x_y.append(x); y_y.append(nan)
-            x_r.append(x); y_r.append(yf)
-    return (x_g, y_g), (x_y, y_y), (x_r, y_r)
+    nan = np.nan
+    return tuple((xs_arr, np.where(m, ys_arr, nan)) for m in masks)
+
+
+def m4_downsample(xs, ys, npix):
+    # M4: на каждый пиксель ширины — первая точка, min, max, последняя;
+    # рисунок линии не меняется, а вершин не больше 4 * npix
+    n = len(xs)
+    npix = int(npix)
+    if npix <= 0 or n <= 4 * npix:
+        return xs, ys
+
+    starts = (np.arange(npix) * n) // npix
+    ends = np.append(starts[1:], n) - 1
+
+    out_x = np.empty((npix, 4), dtype=np.float64)
+    out_y = np.empty((npix, 4), dtype=ys.dtype)
+    out_x[:, 0] = out_x[:, 1] = xs[starts]
+    out_x[:, 2] = out_x[:, 3] = xs[ends]
+    out_y[:, 0] = ys[starts]
+    out_y[:, 1] = np.fmin.reduceat(ys, starts)  # fmin/fmax пропускают NaN (потерянные пинги)
+    out_y[:, 2] = np.fmax.reduceat(ys, starts)
+    out_y[:, 3] = ys[ends]
+    return out_x.ravel(), out_y.ravel()
 
 
 
@@ -627,18 +884,14 @@ class SettingsDialog(QDialog):
         all_nics = list_adapters()
 
         self.cb_simple_adapter = QComboBox()
-        self.cb_simple_adapter.addItem("active")
-        for nic in all_nics:
-            self.cb_simple_adapter.addItem(nic)
+        self.cb_simple_adapter.addItems(["active", *all_nics])
         cur_s = self.settings.simple_adapter if self.settings.simple_adapter else "active"
         if self.cb_simple_adapter.findText(cur_s) == -1:
             cur_s = "active"
         self.cb_simple_adapter.setCurrentText(cur_s)
 
         self.cb_graph_adapter = QComboBox()
-        self.cb_graph_adapter.addItem("active")
-        for nic in all_nics:
-            self.cb_graph_adapter.addItem(nic)
+        self.cb_graph_adapter.addItems(["active", *all_nics])
         cur_g = self.settings.graph_adapter if self.settings.graph_adapter else "active"
         if self.cb_graph_adapter.findText(cur_g) == -1:
             cur_g = "active"
@@ -774,8 +1027,7 @@ class SettingsDialog(QDialog):
 
     def _load_builtin_backgrounds(self):
         self.list_bg.clear()
-        files = sorted([p for p in backgrounds_dir().iterdir()
-                        if p.suffix.lower() in [".png", ".jpg", ".jpeg", ".webp"]])
+        files = list_image_files(backgrounds_dir())
         readable = [p for p in files if is_image_readable(p)]
         for p in readable:
             it = QListWidgetItem(p.name)
@@ -839,18 +1091,17 @@ class SettingsDialog(QDialog):
         self.settings.blur_radius = int(self.sp_blur.value())
         self.settings.window_opacity = int(self.sl_opacity.value())
 
-        self.settings.stats_refresh_ms = int(max(500, min(10000, self.settings.stats_refresh_ms)))
-        self.settings.ping_refresh_ms = int(max(700, min(20000, self.settings.ping_refresh_ms)))
-        self.settings.ping_port = int(max(0, min(65535, self.settings.ping_port)))
-
-        if self.settings.good_mbps < self.settings.ok_mbps:
-            self.settings.good_mbps, self.settings.ok_mbps = self.settings.ok_mbps, self.settings.good_mbps
-        if self.settings.good_ping_ms > self.settings.ok_ping_ms:
-            self.settings.good_ping_ms, self.settings.ok_ping_ms = self.settings.ok_ping_ms, self.settings.good_ping_ms
+        validate_settings(self.settings)
 
 
 
 class NetPulseWindow(QWidget):
+    # %-шаблоны строк advanced-режима и таблицы (форматируются на каждом тике)
+    _ADV1 = "Active: %s   |   Simple: %s   |   Graph: %s"
+    _ADV2 = "Speed(simple): %.2f Mbps   |   Speed(graph): %.2f Mbps   |   Ping: %s"
+    _ADV3 = "Target: %s%s   |   Requests: %d (ok %d / fail %d)   |   ↑ %.2f MB   ↓ %.2f MB"
+    _ROW_FMT = "%.2f"
+
     def __init__(self):
         super().__init__()
         self.settings = load_settings()
@@ -861,20 +1112,35 @@ class NetPulseWindow(QWidget):
 
         self.ping_running = False
 
+        # пока окно скрыто/свёрнуто (или страница не на экране) UI не обновляется,
+        # флаги говорят, что при показе нужна одна догоняющая перерисовка
+        self._simple_dirty = True
+        self._adv_dirty = True
+
         self._dragging = False
         self._drag_offset = QPoint(0, 0)
         self._save_geom_timer = QTimer(self)
         self._save_geom_timer.setSingleShot(True)
         self._save_geom_timer.timeout.connect(self._persist_geometry)
 
+        # фон (масштаб + блюр) пересобираем после того, как ресайз утихнет
+        self._bg_refresh_timer = QTimer(self)
+        self._bg_refresh_timer.setSingleShot(True)
+        self._bg_refresh_timer.timeout.connect(self._update_background)
+
+        # psutil-замеры идут в пуле потоков, чтобы GUI не подвисал на опросе адаптеров
         self.thread_pool = QThreadPool.globalInstance()
-        self.thread_pool.setMaxThreadCount(2)
+        self._sample_inflight = False
+
+        self.pinger = AsyncPinger(self)
+        self.pinger.done.connect(self.on_ping_done)
+        self.pinger.start()
+        QApplication.instance().aboutToQuit.connect(self.pinger.stop)
 
         self.bg = QLabel(self)
         self.bg.setScaledContents(True)
-
-        self.blur_effect = QGraphicsBlurEffect(self)
-        self.blur_effect.setBlurRadius(self.settings.blur_radius)
+        self._bg_src = None  # исходный pixmap фона (без блюра)
+        self._bg_key = None  # ключ того, что сейчас стоит в self.bg
 
         self.root = QWidget(self)
         self.root.setObjectName("root")
@@ -901,10 +1167,9 @@ class NetPulseWindow(QWidget):
         self.stack.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
         self.page_simple = self._build_simple_page()
-        self.page_adv = self._build_adv_page()
+        self.page_adv = None  # строится при первом переходе в advanced (_ensure_adv_page)
 
         self.stack.addWidget(self.page_simple)
-        self.stack.addWidget(self.page_adv)
 
         root_l = QVBoxLayout(self.root)
         root_l.setContentsMargins(0, 0, 0, 0)
@@ -915,19 +1180,33 @@ class NetPulseWindow(QWidget):
         self.active_adapter = pick_active_adapter_name()
         self.lbl_connected.setText(f"Подключено — {self.active_adapter}")
 
-        self._last_active_check = 0.0
-        self._active_check_interval = 3.0  # сек
-
-        self.nic_last = {}
-        self.nic_speed_mbps = {}
-        self.nic_sent_mb = {}
-        self.nic_recv_mb = {}
-
-        io = psutil.net_io_counters()
-        self.total_sent_mb = io.bytes_sent / (1024 * 1024)
-        self.total_recv_mb = io.bytes_recv / (1024 * 1024)
+        # активный адаптер перепроверяется по событиям сети (QNetworkInformation),
+        # а если бэкенда нет — опросом раз в _active_check_interval
+        self._last_active_check = time.monotonic()
+        self._active_check_interval = 5.0  # сек
+        self._active_check_pending = False
+        self._sample_check_active = False
+        self._netinfo = self._setup_network_events()
+        # состояние адаптеров — массивы по полям (SoA), строка = индекс в self._needed;
+        # _refresh_needed_nics пересобирает их при смене набора адаптеров
+        self._needed = ()
+        self._nic_idx = {}
+        self._nic_seen = np.zeros(0, np.bool_)  # был хотя бы один снимок
+        self._prev_sent = np.zeros(0, np.int64)
+        self._prev_recv = np.zeros(0, np.int64)
+        self._prev_t = np.zeros(0, np.float64)
+        self._speed_mbps = np.zeros(0, np.float32)
+        self._sent_mb = np.zeros(0, np.float64)
+        self._recv_mb = np.zeros(0, np.float64)
+        self._refresh_needed_nics()
+
+        # итоговые MB считаются лениво из последнего снимка pernic (см. _totals_mb)
+        self._pernic = psutil.net_io_counters(pernic=True)
+        self._totals_dirty = True
+        self._totals = (0.0, 0.0)
 
         self.last_ping_ms = None
+        self._ping_str_short = "—"  # готовая строка пинга для подписей, меняется только в on_ping_done
         self.last_mbps_graph = 0.0
         self.last_mbps_simple = 0.0
 
@@ -937,20 +1216,23 @@ class NetPulseWindow(QWidget):
 
         self.buf_len = 240
         now = time.time()
-        self.t_hist = deque([now] * self.buf_len, maxlen=self.buf_len)
-        self.mbps_hist = deque([0.0] * self.buf_len, maxlen=self.buf_len)
-        self.ping_hist = deque([float("nan")] * self.buf_len, maxlen=self.buf_len)
-
-        self.stats_timer = QTimer(self)
-        self.stats_timer.timeout.connect(self.tick_stats)
-        self.stats_timer.start(self.settings.stats_refresh_ms)
-
-        self.ping_timer = QTimer(self)
-        self.ping_timer.timeout.connect(self.request_ping)
-        self.ping_timer.start(self.settings.ping_refresh_ms)
+        # история — линейные буферы в 4 раза больше окна: точки дописываются подряд,
+        # окно графика = непрерывный срез [_hist_pos - buf_len : _hist_pos] без копирования;
+        # при заполнении хвост переносится в начало (раз в 3 * buf_len тиков)
+        cap = 4 * self.buf_len
+        self._hist_pos = self.buf_len
+        self.t_hist = np.full(cap, now, dtype=np.float64)
+        # значения — float32 (для Mbps/ms точности хватает), время — float64 (epoch-секунды)
+        self.mbps_hist = np.zeros(cap, dtype=np.float32)
+        self.ping_hist = np.full(cap, np.nan, dtype=np.float32)
+
+        # один таймер на всё: single-shot до ближайшего срока статистики / ping / трея
+        self._master_timer = QTimer(self)
+        self._master_timer.setSingleShot(True)
+        self._master_timer.timeout.connect(self._master_tick)
+        self._restart_master_timer()
 
         self.tray = None
-        self.tray_update_timer = None
         self.tray_menu = None
 
         self.tray_info1 = None
@@ -987,6 +1269,9 @@ class NetPulseWindow(QWidget):
         self.lbl_ping = QLabel("— ms")
         self.lbl_ping.setObjectName("ping")
 
+        self._last_c_mbps = None
+        self._last_c_ping = None
+
         center = QWidget()
         cl = QHBoxLayout(center)
         cl.setContentsMargins(0, 0, 0, 0)
@@ -1017,7 +1302,16 @@ class NetPulseWindow(QWidget):
         l.addWidget(bottom)
         return page
 
+    def _ensure_adv_page(self):
+        if self.page_adv is None:
+            self.page_adv = self._build_adv_page()
+            self.stack.addWidget(self.page_adv)
+
     def _build_adv_page(self) -> QWidget:
+        # pyqtgraph тяжёлый на импорт — грузим только когда реально нужен advanced
+        import pyqtgraph as pg
+        ensure_split_kernel()
+
         page = QWidget()
         l = QVBoxLayout(page)
         l.setContentsMargins(12, 8, 12, 12)
@@ -1030,7 +1324,9 @@ class NetPulseWindow(QWidget):
         l.addWidget(self.lbl_adv_line2)
         l.addWidget(self.lbl_adv_line3)
 
-        pg.setConfigOptions(antialias=True)
+        # линии рисуются через OpenGL, если установлен PyOpenGL; иначе обычный растровый QPainter
+        use_gl = importlib.util.find_spec("OpenGL") is not None
+        pg.setConfigOptions(antialias=True, useOpenGL=use_gl, enableExperimental=use_gl)
 
         axis_time_mbps = pg.DateAxisItem(orientation="bottom")
         axis_time_ping = pg.DateAxisItem(orientation="bottom")
@@ -1058,23 +1354,26 @@ class NetPulseWindow(QWidget):
 
         self.plot_mbps.setClipToView(True)
         self.plot_ping.setClipToView(True)
+        self.plot_mbps.setDownsampling(auto=True, mode="peak")
+        self.plot_ping.setDownsampling(auto=True, mode="peak")
 
         self.graph_window_sec = 120
 
-        self.mbps_g = self.plot_mbps.plot([], [], pen=pg.mkPen(GREEN, width=self.settings.line_width))
-        self.mbps_y = self.plot_mbps.plot([], [], pen=pg.mkPen(YELLOW, width=self.settings.line_width))
-        self.mbps_r = self.plot_mbps.plot([], [], pen=pg.mkPen(RED, width=self.settings.line_width))
-        self.mbps_c = self.plot_mbps.plot([], [], pen=pg.mkPen(self.settings.graph_custom_color, width=self.settings.line_width))
+        # NaN = разрыв линии; connect="finite" не даёт pyqtgraph каждый раз сканировать данные на NaN.
+        # В режиме custom вся серия рисуется линией *_g (перо меняется в _apply_graph_pens)
+        self.mbps_g = self.plot_mbps.plot([], [], pen=pg.mkPen(GREEN, width=self.settings.line_width), connect="finite")
+        self.mbps_y = self.plot_mbps.plot([], [], pen=pg.mkPen(YELLOW, width=self.settings.line_width), connect="finite")
+        self.mbps_r = self.plot_mbps.plot([], [], pen=pg.mkPen(RED, width=self.settings.line_width), connect="finite")
 
-        self.ping_g = self.plot_ping.plot([], [], pen=pg.mkPen(GREEN, width=self.settings.line_width))
-        self.ping_y = self.plot_ping.plot([], [], pen=pg.mkPen(YELLOW, width=self.settings.line_width))
-        self.ping_r = self.plot_ping.plot([], [], pen=pg.mkPen(RED, width=self.settings.line_width))
-        self.ping_c = self.plot_ping.plot([], [], pen=pg.mkPen(self.settings.graph_custom_color, width=self.settings.line_width))
+        self.ping_g = self.plot_ping.plot([], [], pen=pg.mkPen(GREEN, width=self.settings.line_width), connect="finite")
+        self.ping_y = self.plot_ping.plot([], [], pen=pg.mkPen(YELLOW, width=self.settings.line_width), connect="finite")
+        self.ping_r = self.plot_ping.plot([], [], pen=pg.mkPen(RED, width=self.settings.line_width), connect="finite")
 
         l.addWidget(self.plot_mbps, 2)
         l.addWidget(self.plot_ping, 2)
 
         self.tbl = QTableWidget(0, 4)
+        self._tbl_items = []
         self.tbl.setHorizontalHeaderLabels(["Адаптер", "Mbps", "Sent MB", "Recv MB"])
         self.tbl.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.tbl.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
@@ -1152,6 +1451,7 @@ class NetPulseWindow(QWidget):
         super().resizeEvent(event)
         self.bg.setGeometry(0, 0, self.width(), self.height())
         self.root.setGeometry(0, 0, self.width(), self.height())
+        self._bg_refresh_timer.start(80)
         self._schedule_save_geometry()
 
     def moveEvent(self, event):
@@ -1180,7 +1480,7 @@ class NetPulseWindow(QWidget):
             if p.exists():
                 pm = safe_pixmap(p)
                 if pm is not None:
-                    self.bg.setPixmap(pm)
+                    self._set_bg_source(pm)
                     return
 
         if self.settings.background_path:
@@ -1188,23 +1488,36 @@ class NetPulseWindow(QWidget):
             if p.exists():
                 pm = safe_pixmap(p)
                 if pm is not None:
-                    self.bg.setPixmap(pm)
+                    self._set_bg_source(pm)
                     return
 
         pm = QPixmap(self.size())
         pm.fill(Qt.black)
-        self.bg.setPixmap(pm)
+        self._set_bg_source(pm)
+
+    def _set_bg_source(self, pm):
+        self._bg_src = pm
+        self._apply_blur_for_mode()
 
     def _apply_blur_for_mode(self):
+        pm = self._bg_src
+        if pm is None:
+            return
         want = self.settings.blur_advanced if self.settings.mode == "advanced" else self.settings.blur_simple
-        if want and self.settings.blur_radius > 0:
-            self.blur_effect.setBlurRadius(self.settings.blur_radius)
-            self.bg.setGraphicsEffect(self.blur_effect)
+        radius = int(self.settings.blur_radius)
+        if want and radius > 0 and not self.size().isEmpty():
+            key = (pm.cacheKey(), self.width(), self.height(), radius)
+            if key != self._bg_key:
+                self.bg.setPixmap(blurred_pixmap(pm, self.size(), radius))
         else:
-            self.bg.setGraphicsEffect(None)
+            key = (pm.cacheKey(),)
+            if key != self._bg_key:
+                self.bg.setPixmap(pm)
+        self._bg_key = key
 
     def _apply_mode_and_geometry(self):
         if self.settings.mode == "advanced":
+            self._ensure_adv_page()
             self.stack.setCurrentIndex(1)
             self.resize(self.settings.adv_w, self.settings.adv_h)
         else:
@@ -1214,10 +1527,12 @@ class NetPulseWindow(QWidget):
         if self.settings.remember_geometry and self.settings.window_x >= 0 and self.settings.window_y >= 0:
             self.move(self.settings.window_x, self.settings.window_y)
 
+        self._catch_up_ui()
+
     def _schedule_save_geometry(self):
         if not self.settings.remember_geometry:
             return
-        self._save_geom_timer.start(250)
+        self._save_geom_timer.start(750)
 
     def _persist_geometry(self):
         if not self.settings.remember_geometry:
@@ -1234,7 +1549,7 @@ class NetPulseWindow(QWidget):
         nic = (self.settings.simple_adapter or "active")
         if nic == "active":
             return self.active_adapter
-        if nic not in self.nic_speed_mbps:
+        if self._nic_row(nic) is None:
             return self.active_adapter
         return nic
 
@@ -1244,7 +1559,7 @@ class NetPulseWindow(QWidget):
         if nic == "active":
             return self._resolve_simple_adapter()
 
-        if nic not in self.nic_speed_mbps:
+        if self._nic_row(nic) is None:
             return self._resolve_simple_adapter()
         return nic
 
@@ -1261,25 +1576,28 @@ class NetPulseWindow(QWidget):
     def _apply_graph_pens(self):
         lw = self.settings.line_width
         if hasattr(self, "mbps_g"):
-            self.mbps_g.setPen(pg.mkPen(GREEN, width=lw))
+            import pyqtgraph as pg
+
+            custom = self.settings.graph_color_mode == "custom"
+            main_col = self.settings.graph_custom_color if custom else GREEN
+
+            self.mbps_g.setPen(pg.mkPen(main_col, width=lw))
             self.mbps_y.setPen(pg.mkPen(YELLOW, width=lw))
             self.mbps_r.setPen(pg.mkPen(RED, width=lw))
-            self.mbps_c.setPen(pg.mkPen(self.settings.graph_custom_color, width=lw))
 
-            self.ping_g.setPen(pg.mkPen(GREEN, width=lw))
+            self.ping_g.setPen(pg.mkPen(main_col, width=lw))
             self.ping_y.setPen(pg.mkPen(YELLOW, width=lw))
             self.ping_r.setPen(pg.mkPen(RED, width=lw))
-            self.ping_c.setPen(pg.mkPen(self.settings.graph_custom_color, width=lw))
+
+            if custom:
+                for item in (self.mbps_y, self.mbps_r, self.ping_y, self.ping_r):
+                    item.setData([], [])
 
     def _setup_tray(self):
         if self.tray:
             self.tray.hide()
             self.tray.deleteLater()
             self.tray = None
-        if self.tray_update_timer:
-            self.tray_update_timer.stop()
-            self.tray_update_timer.deleteLater()
-            self.tray_update_timer = None
 
         if not self.settings.tray_enabled:
             return
@@ -1316,12 +1634,10 @@ class NetPulseWindow(QWidget):
         self.tray_menu.addAction(act_quit)
 
         self.tray.setContextMenu(self.tray_menu)
+        self.tray_menu.aboutToShow.connect(self._update_tray_menu_info)
         self.tray.activated.connect(self._tray_activated)
         self.tray.show()
 
-        self.tray_update_timer = QTimer(self)
-        self.tray_update_timer.timeout.connect(self._update_tray_menu_info)
-        self.tray_update_timer.start(max(500, self.settings.stats_refresh_ms))
         self._update_tray_menu_info()
 
     def _toggle_show_hide(self):
@@ -1331,8 +1647,9 @@ class NetPulseWindow(QWidget):
             self.show_normal()
 
     def _update_tray_menu_info(self):
-        ping = self.last_ping_ms
-        ping_str = "—" if ping is None else f"{ping} ms"
+        if not self.tray or not self.tray.isVisible():
+            return
+        ping_str = self._ping_str_short
 
         simple_nic = self._resolve_simple_adapter()
         graph_nic = self._resolve_graph_adapter()
@@ -1341,7 +1658,8 @@ class NetPulseWindow(QWidget):
         self.tray_info1.setText(f"{APP_NAME} v{APP_VERSION}  |  Active: {self.active_adapter}")
         self.tray_info2.setText(f"Simple: {simple_nic} {self.last_mbps_simple:.2f} Mbps  |  Graph: {graph_nic} {self.last_mbps_graph:.2f} Mbps")
         self.tray_info3.setText(f"Ping: {ping_str}  →  {self.settings.ping_host}{port_str}")
-        self.tray_info4.setText(f"Req: {self.ping_sent} (ok {self.ping_ok} / fail {self.ping_fail})  |  ↑ {self.total_sent_mb:.2f} MB  ↓ {self.total_recv_mb:.2f} MB")
+        sent_mb, recv_mb = self._totals_mb()
+        self.tray_info4.setText(f"Req: {self.ping_sent} (ok {self.ping_ok} / fail {self.ping_fail})  |  ↑ {sent_mb:.2f} MB  ↓ {recv_mb:.2f} MB")
 
         if self.tray_act_toggle:
             self.tray_act_toggle.setText("Скрыть" if self.isVisible() else "Показать")
@@ -1362,68 +1680,185 @@ class NetPulseWindow(QWidget):
         if self.tray_act_toggle:
             self.tray_act_toggle.setText("Скрыть")
 
-    def _needed_nics(self) -> set:
-        need = set()
-        need.add(self.active_adapter)
-        need.add(self._resolve_graph_adapter())
-        need.add(self._resolve_simple_adapter())
-        for nic in (self.settings.monitored_adapters or []):
-            need.add(nic)
-        return need
+    def _restart_master_timer(self):
+        # [период, следующий срок (monotonic), действие] — у каждой задачи свой период из настроек.
+        # Трей: меню обновляется и перед показом (aboutToShow, клик), здесь достаточно держать tooltip свежим
+        now = time.monotonic()
+        self._master_jobs = [
+            [period, now + period, fn] for period, fn in (
+                (self.settings.stats_refresh_ms / 1000.0, self.tick_stats),
+                (self.settings.ping_refresh_ms / 1000.0, self.request_ping),
+                (TRAY_REFRESH_MS / 1000.0, self._update_tray_menu_info),
+            )
+        ]
+        self._schedule_master_tick()
+
+    def _schedule_master_tick(self):
+        due = min(job[1] for job in self._master_jobs)
+        self._master_timer.start(max(0, math.ceil((due - time.monotonic()) * 1000)))
+
+    def _master_tick(self):
+        now = time.monotonic()
+        for job in self._master_jobs:
+            period, due, fn = job
+            if due > now:
+                continue
+            try:
+                fn()
+            except Exception:
+                # таймер single-shot: исключение не должно помешать перевзводу и остальным задачам
+                traceback.print_exc()
+            # сроки идут от расписания, а не от факта срабатывания; после долгой паузы не догоняем
+            nxt = due + period
+            job[1] = nxt if nxt > now else now + period
+        self._schedule_master_tick()
+
+    def _setup_network_events(self):
+        try:
+            if not QNetworkInformation.loadDefaultBackend():
+                return None
+            ni = QNetworkInformation.instance()
+        except Exception:
+            return None
+        if ni is None or not ni.supports(QNetworkInformation.Feature.Reachability):
+            return None
+
+        ni.reachabilityChanged.connect(self._refresh_active_adapter)
+        if hasattr(ni, "transportMediumChanged"):
+            ni.transportMediumChanged.connect(self._refresh_active_adapter)
+        return ni
+
+    def _refresh_active_adapter(self, *_):
+        # сама проверка (pick_active_adapter_name) идёт в NetSampleTask на ближайшем тике;
+        # без опроса прошлый снимок трафика может быть многочасовым — адаптер с историей
+        # трафика победил бы только что поднятый, поэтому окно замера сбрасываем
+        invalidate_adapter_cache()
+        reset_active_io_window()
+        self._active_check_pending = True
+
+    def _refresh_needed_nics(self):
+        # набор адаптеров, которые реально показываем; пересчитывается только при смене
+        # настроек или активного адаптера, а не на каждом тике
+        need = {self.active_adapter, self.settings.simple_adapter, self.settings.graph_adapter}
+        need.update(self.settings.monitored_adapters or [])
+        need.discard("active")
+        # в настройках может оказаться null/не строка — сортировка таких не переживёт
+        names = tuple(sorted(n for n in need if isinstance(n, str) and n))
+        if names == self._needed:
+            return
+
+        # переносим накопленное состояние адаптеров, которые остались в наборе
+        old_idx = self._nic_idx
+        keep = [(i, old_idx[n]) for i, n in enumerate(names) if n in old_idx]
+        dst = [i for i, _ in keep]
+        src = [j for _, j in keep]
+        for attr in ("_nic_seen", "_prev_sent", "_prev_recv", "_prev_t", "_speed_mbps", "_sent_mb", "_recv_mb"):
+            old = getattr(self, attr)
+            new = np.zeros(len(names), old.dtype)
+            new[dst] = old[src]
+            setattr(self, attr, new)
+
+        self._needed = names
+        self._nic_idx = {n: i for i, n in enumerate(names)}
+
+    def _nic_row(self, nic):
+        # индекс адаптера в массивах состояния или None, если по нему ещё нет данных
+        i = self._nic_idx.get(nic)
+        if i is None or not self._nic_seen[i]:
+            return None
+        return i
 
     def tick_stats(self):
-        tnow = time.time()
+        if self._sample_inflight:
+            return
+        self._sample_inflight = True
 
-        if tnow - self._last_active_check >= self._active_check_interval:
+        tnow = time.monotonic()
+        check_active = self._active_check_pending or (
+            self._netinfo is None and tnow - self._last_active_check >= self._active_check_interval)
+        if check_active:
+            self._active_check_pending = False
             self._last_active_check = tnow
-            new_adapter = pick_active_adapter_name()
-            if new_adapter != self.active_adapter:
-                self.active_adapter = new_adapter
-                self.lbl_connected.setText(f"Подключено — {self.active_adapter}")
 
-        needed = self._needed_nics()
-        pernic = psutil.net_io_counters(pernic=True)
+        self._sample_check_active = check_active
+        task = NetSampleTask(check_active)
+        task.signals.done.connect(self._on_net_sample)
+        self.thread_pool.start(task)
+
+    def _on_net_sample(self, pernic, new_adapter, twall, tmono):
+        self._sample_inflight = False
+        if pernic is None:
+            # снимок не удался — попробуем на следующем тике, вместе с проверкой адаптера, если она была
+            self._active_check_pending = self._active_check_pending or self._sample_check_active
+            return
+
+        if new_adapter is not None and new_adapter != self.active_adapter:
+            self.active_adapter = new_adapter
+            self.lbl_connected.setText(f"Подключено — {self.active_adapter}")
+            self._refresh_needed_nics()
 
-        for nic in list(needed):
+        rows = []
+        cur = []
+        for i, nic in enumerate(self._needed):
             c = pernic.get(nic)
-            if c is None:
-                continue
-            sent, recv = c.bytes_sent, c.bytes_recv
-            if nic not in self.nic_last:
-                self.nic_last[nic] = (sent, recv, tnow)
-                self.nic_speed_mbps[nic] = 0.0
-                self.nic_sent_mb[nic] = sent / (1024 * 1024)
-                self.nic_recv_mb[nic] = recv / (1024 * 1024)
-            else:
-                psent, precv, pt = self.nic_last[nic]
-                dt = max(0.10, tnow - pt)
-                ds = sent - psent
-                dr = recv - precv
-                self.nic_speed_mbps[nic] = max(0.0, (ds + dr) * 8.0 / dt / 1_000_000.0)
-                self.nic_sent_mb[nic] = sent / (1024 * 1024)
-                self.nic_recv_mb[nic] = recv / (1024 * 1024)
-                self.nic_last[nic] = (sent, recv, tnow)
-
-        io = psutil.net_io_counters()
-        self.total_sent_mb = io.bytes_sent / (1024 * 1024)
-        self.total_recv_mb = io.bytes_recv / (1024 * 1024)
+            if c is not None:
+                rows.append(i)
+                cur.append((c.bytes_sent, c.bytes_recv))
+
+        if rows:
+            idx = np.array(rows, np.intp)
+            a = np.array(cur, dtype=np.int64)
+            sent, recv = a[:, 0], a[:, 1]
+            # новый адаптер: предыдущий снимок = текущий, скорость 0
+            seen = self._nic_seen[idx]
+            psent = np.where(seen, self._prev_sent[idx], sent)
+            precv = np.where(seen, self._prev_recv[idx], recv)
+            dt = np.maximum(0.10, tmono - np.where(seen, self._prev_t[idx], tmono))
+            # сброс счётчика (переподключение адаптера) даёт отрицательную разницу — режем до 0
+            delta = np.clip(sent - psent, 0, None) + np.clip(recv - precv, 0, None)
+
+            self._speed_mbps[idx] = delta * 8.0 / dt / 1_000_000.0
+            self._sent_mb[idx] = sent / (1024 * 1024)
+            self._recv_mb[idx] = recv / (1024 * 1024)
+            self._prev_sent[idx] = sent
+            self._prev_recv[idx] = recv
+            self._prev_t[idx] = tmono
+            self._nic_seen[idx] = True
+
+        self._pernic = pernic
+        self._totals_dirty = True
 
         simple_nic = self._resolve_simple_adapter()
         graph_nic = self._resolve_graph_adapter()
 
-        self.last_mbps_simple = float(self.nic_speed_mbps.get(simple_nic, 0.0))
-        self.last_mbps_graph = float(self.nic_speed_mbps.get(graph_nic, 0.0))
-
-        self.t_hist.append(tnow)
-        self.mbps_hist.append(float(self.last_mbps_graph))
-        self.ping_hist.append(float(self.last_ping_ms) if isinstance(self.last_ping_ms, int) else float("nan"))
+        i_simple = self._nic_row(simple_nic)
+        i_graph = self._nic_row(graph_nic)
+        self.last_mbps_simple = 0.0 if i_simple is None else float(self._speed_mbps[i_simple])
+        self.last_mbps_graph = 0.0 if i_graph is None else float(self._speed_mbps[i_graph])
+
+        i = self._hist_pos
+        if i == self.t_hist.size:
+            n = self.buf_len
+            for buf in (self.t_hist, self.mbps_hist, self.ping_hist):
+                buf[:n] = buf[i - n:i]
+            i = n
+        self.t_hist[i] = twall
+        self.mbps_hist[i] = self.last_mbps_graph
+        self.ping_hist[i] = self.last_ping_ms if isinstance(self.last_ping_ms, int) else np.nan
+        self._hist_pos = i + 1
 
         self._update_simple_ui()
         if self.settings.mode == "advanced":
             self._update_advanced_ui()
 
-        if self.tray:
-            self._update_tray_menu_info()
+    def _totals_mb(self):
+        # итог = сумма по адаптерам из последнего снимка; пересчёт только после нового снимка
+        if self._totals_dirty:
+            counters = self._pernic.values()
+            self._totals = (sum(c.bytes_sent for c in counters) / (1024 * 1024),
+                            sum(c.bytes_recv for c in counters) / (1024 * 1024))
+            self._totals_dirty = False
+        return self._totals
 
     def request_ping(self):
         if self.ping_running:
@@ -1431,17 +1866,18 @@ class NetPulseWindow(QWidget):
         self.ping_running = True
         self.ping_sent += 1
 
-        task = PingTask(self.settings.ping_host, int(self.settings.ping_port or 0))
-        task.signals.done.connect(self.on_ping_done)
-        self.thread_pool.start(task)
+        self.pinger.request(self.settings.ping_host, int(self.settings.ping_port or 0))
 
     def on_ping_done(self, ms):
+        prev = self.last_ping_ms
         if isinstance(ms, int):
             self.last_ping_ms = int(ms)
             self.ping_ok += 1
         else:
             self.last_ping_ms = None
             self.ping_fail += 1
+        if self.last_ping_ms != prev:
+            self._ping_str_short = "—" if self.last_ping_ms is None else f"{self.last_ping_ms} ms"
 
         self.ping_running = False
 
@@ -1449,58 +1885,86 @@ class NetPulseWindow(QWidget):
         if self.settings.mode == "advanced":
             self._update_advanced_ui()
 
-        if self.tray:
-            self._update_tray_menu_info()
+    def _ui_hidden(self) -> bool:
+        return not self.isVisible() or self.isMinimized()
+
+    def _catch_up_ui(self):
+        if self._simple_dirty:
+            self._update_simple_ui()
+        if self._adv_dirty and self.settings.mode == "advanced":
+            self._update_advanced_ui()
 
     def _update_simple_ui(self):
+        if self._ui_hidden() or self.stack.currentIndex() != 0:
+            self._simple_dirty = True
+            return
+        self._simple_dirty = False
+
         ping = self.last_ping_ms
         mbps = self.last_mbps_simple
 
         self.lbl_mbps.setText(f"{mbps:.1f} Mbps")
-        self.lbl_ping.setText(f"{('—' if ping is None else ping)} ms")
+        self.lbl_ping.setText("— ms" if ping is None else self._ping_str_short)
 
         c_mbps = quality_color(mbps, self.settings.good_mbps, self.settings.ok_mbps, invert=False)
         c_ping = quality_color(ping, self.settings.good_ping_ms, self.settings.ok_ping_ms, invert=True)
 
-        self.lbl_mbps.setStyleSheet(f"color:{c_mbps}; font-size:34px; font-weight:800; letter-spacing:0.5px;")
-        self.lbl_ping.setStyleSheet(f"color:{c_ping}; font-size:34px; font-weight:800; letter-spacing:0.5px;")
+        # setStyleSheet заставляет Qt заново разбирать CSS — только когда цвет реально сменился
+        if c_mbps != self._last_c_mbps:
+            self._last_c_mbps = c_mbps
+            self.lbl_mbps.setStyleSheet(f"color:{c_mbps}; font-size:34px; font-weight:800; letter-spacing:0.5px;")
+        if c_ping != self._last_c_ping:
+            self._last_c_ping = c_ping
+            self.lbl_ping.setStyleSheet(f"color:{c_ping}; font-size:34px; font-weight:800; letter-spacing:0.5px;")
+
+        sent_mb, recv_mb = self._totals_mb()
+        self.lbl_up.setText(f"↑ {sent_mb:.2f} MB")
+        self.lbl_down.setText(f"↓ {recv_mb:.2f} MB")
 
-        self.lbl_up.setText(f"↑ {self.total_sent_mb:.2f} MB")
-        self.lbl_down.setText(f"↓ {self.total_recv_mb:.2f} MB")
+    def _hist_view(self, buf):
+        return buf[self._hist_pos - self.buf_len:self._hist_pos]
 
     def _update_advanced_ui(self):
-        ping_str = "—" if self.last_ping_ms is None else f"{self.last_ping_ms} ms"
+        if self._ui_hidden():
+            self._adv_dirty = True
+            return
+        self._adv_dirty = False
+
+        import pyqtgraph as pg
+
+        ping_str = self._ping_str_short
         graph_nic = self._resolve_graph_adapter()
         simple_nic = self._resolve_simple_adapter()
         port_str = f":{self.settings.ping_port}" if int(self.settings.ping_port or 0) > 0 else " (auto)"
 
-        self.lbl_adv_line1.setText(f"Active: {self.active_adapter}   |   Simple: {simple_nic}   |   Graph: {graph_nic}")
-        self.lbl_adv_line2.setText(f"Speed(simple): {self.last_mbps_simple:.2f} Mbps   |   Speed(graph): {self.last_mbps_graph:.2f} Mbps   |   Ping: {ping_str}")
-        self.lbl_adv_line3.setText(f"Target: {self.settings.ping_host}{port_str}   |   Requests: {self.ping_sent} (ok {self.ping_ok} / fail {self.ping_fail})   |   ↑ {self.total_sent_mb:.2f} MB   ↓ {self.total_recv_mb:.2f} MB")
+        self.lbl_adv_line1.setText(self._ADV1 % (self.active_adapter, simple_nic, graph_nic))
+        self.lbl_adv_line2.setText(self._ADV2 % (self.last_mbps_simple, self.last_mbps_graph, ping_str))
+        sent_mb, recv_mb = self._totals_mb()
+        self.lbl_adv_line3.setText(self._ADV3 % (self.settings.ping_host, port_str, self.ping_sent, self.ping_ok,
+                                                 self.ping_fail, sent_mb, recv_mb))
 
-        xs = list(self.t_hist)
-        mbps_ys = [float(v) for v in self.mbps_hist]
-        ping_ys = [float(v) for v in self.ping_hist]
+        xs = self._hist_view(self.t_hist)
+        mbps_ys = self._hist_view(self.mbps_hist)
+        ping_ys = self._hist_view(self.ping_hist)
 
-        if self.settings.graph_color_mode == "custom":
-            self.mbps_c.setData(xs, mbps_ys)
-            self.ping_c.setData(xs, ping_ys)
+        # при узком графике прореживаем до раскраски, чтобы не резать лишние точки
+        xs_m, mbps_ys = m4_downsample(xs, mbps_ys, self.plot_mbps.getViewBox().width())
+        xs_p, ping_ys = m4_downsample(xs, ping_ys, self.plot_ping.getViewBox().width())
 
-            nan = float("nan")
-            self.mbps_g.setData(xs, [nan]*len(xs)); self.mbps_y.setData(xs, [nan]*len(xs)); self.mbps_r.setData(xs, [nan]*len(xs))
-            self.ping_g.setData(xs, [nan]*len(xs)); self.ping_y.setData(xs, [nan]*len(xs)); self.ping_r.setData(xs, [nan]*len(xs))
+        if self.settings.graph_color_mode == "custom":
+            # жёлтая/красная линии уже очищены в _apply_graph_pens
+            self.mbps_g.setData(xs_m, mbps_ys)
+            self.ping_g.setData(xs_p, ping_ys)
         else:
-            (xg, yg), (xy, yy), (xr, yr) = split_series_by_quality(xs, mbps_ys, self.settings.good_mbps, self.settings.ok_mbps, invert=False)
+            (xg, yg), (xy, yy), (xr, yr) = split_series_by_quality(xs_m, mbps_ys, self.settings.good_mbps, self.settings.ok_mbps, invert=False)
             self.mbps_g.setData(xg, yg)
             self.mbps_y.setData(xy, yy)
             self.mbps_r.setData(xr, yr)
-            self.mbps_c.setData([], [])
 
-            (xg2, yg2), (xy2, yy2), (xr2, yr2) = split_series_by_quality(xs, ping_ys, self.settings.good_ping_ms, self.settings.ok_ping_ms, invert=True)
+            (xg2, yg2), (xy2, yy2), (xr2, yr2) = split_series_by_quality(xs_p, ping_ys, self.settings.good_ping_ms, self.settings.ok_ping_ms, invert=True)
             self.ping_g.setData(xg2, yg2)
             self.ping_y.setData(xy2, yy2)
             self.ping_r.setData(xr2, yr2)
-            self.ping_c.setData([], [])
 
         selected = self.settings.monitored_adapters or []
         if not selected:
@@ -1508,20 +1972,34 @@ class NetPulseWindow(QWidget):
 
         rows = []
         for nic in selected:
-            if nic in self.nic_speed_mbps:
+            i = self._nic_row(nic)
+            if i is not None:
                 rows.append((nic,
-                             float(self.nic_speed_mbps.get(nic, 0.0)),
-                             float(self.nic_sent_mb.get(nic, 0.0)),
-                             float(self.nic_recv_mb.get(nic, 0.0))))
-
-        self.tbl.setRowCount(len(rows))
-        for r, (nic, sp, s_mb, r_mb) in enumerate(rows):
-            self.tbl.setItem(r, 0, QTableWidgetItem(nic))
-            self.tbl.setItem(r, 1, QTableWidgetItem(f"{sp:.2f}"))
-            self.tbl.setItem(r, 2, QTableWidgetItem(f"{s_mb:.2f}"))
-            self.tbl.setItem(r, 3, QTableWidgetItem(f"{r_mb:.2f}"))
-
-        if xs:
+                             float(self._speed_mbps[i]),
+                             float(self._sent_mb[i]),
+                             float(self._recv_mb[i])))
+
+        # ячейки создаются один раз на строку, дальше только setText при изменении
+        if len(rows) != len(self._tbl_items):
+            self.tbl.setRowCount(len(rows))
+            del self._tbl_items[len(rows):]
+            for r in range(len(self._tbl_items), len(rows)):
+                items = [QTableWidgetItem() for _ in range(self.tbl.columnCount())]
+                for c, it in enumerate(items):
+                    self.tbl.setItem(r, c, it)
+                self._tbl_items.append(items)
+
+        self.tbl.setUpdatesEnabled(False)
+        self.tbl.blockSignals(True)
+        fmt = self._ROW_FMT
+        for items, (nic, sp, s_mb, r_mb) in zip(self._tbl_items, rows):
+            for it, text in zip(items, (nic, fmt % sp, fmt % s_mb, fmt % r_mb)):
+                if it.text() != text:
+                    it.setText(text)
+        self.tbl.blockSignals(False)
+        self.tbl.setUpdatesEnabled(True)
+
+        if xs.size:
             tmax = xs[-1]
             tmin = tmax - self.graph_window_sec
 
@@ -1533,6 +2011,8 @@ class NetPulseWindow(QWidget):
             self.plot_ping.enableAutoRange(axis=pg.ViewBox.YAxis, enable=True)
 
     def open_settings(self):
+        # в диалоге нужен свежий список адаптеров (могли подключить новый)
+        invalidate_adapter_cache()
         dlg = SettingsDialog(self, self.settings)
         if dlg.exec() == QDialog.Accepted:
             dlg.apply_to_settings()
@@ -1544,12 +2024,9 @@ class NetPulseWindow(QWidget):
 
             save_settings(self.settings)
             set_windows_autostart(APP_NAME, self.settings.autostart)
+            self._refresh_needed_nics()
 
-            self.stats_timer.stop()
-            self.stats_timer.start(self.settings.stats_refresh_ms)
-
-            self.ping_timer.stop()
-            self.ping_timer.start(self.settings.ping_refresh_ms)
+            self._restart_master_timer()
 
             self._apply_root_style()
             self._update_background()
@@ -1560,6 +2037,15 @@ class NetPulseWindow(QWidget):
 
             self._setup_tray()
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._catch_up_ui()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange and not self.isMinimized():
+            self._catch_up_ui()
+
     def closeEvent(self, event):
         if self.settings.tray_enabled and self.tray:
             event.ignore()
@@ -1573,6 +2059,7 @@ def main():
     ensure_seed_backgrounds()
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
+    QPixmapCache.setCacheLimit(65536)  # KB
 
     w = NetPulseWindow()
     w.show_normal()